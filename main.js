@@ -768,31 +768,63 @@ const face = {
   onMouseLeave() { this._mouseActive = false; },
 };
 
-// ─────────────────────────────────────────────────
-// BASE64 → BLOB URL HELPER
-// ─────────────────────────────────────────────────
-function b64ToObjectUrl(b64) {
-  const binary = atob(b64);
-  const bytes = new Uint8Array(binary.length);
-  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
-  return URL.createObjectURL(new Blob([bytes], { type: 'audio/mpeg' }));
-}
-
 // ─────────────────────────────────────────────────
 // TTS AUDIO QUEUE
 // ─────────────────────────────────────────────────
+// MediaSource lets an utterance start playing from its first MP3 chunk;
+// without it (e.g. iOS Safari) we wait for audio_end and play a Blob.
+const MSE_MP3 = typeof MediaSource !== 'undefined' && MediaSource.isTypeSupported('audio/mpeg');
+
 const ttsPlayer = {
   _queue: [],
+  _streams: new Map(),  // seq → utterance still receiving chunks
   _playing: false,
   _neutralTimer: null,
   _currentAudio: null,
 
-  enqueue(b64, text, emotion) {
+  // Streamed utterance lifecycle: begin() → append()* → end()
+  begin(seq, text, emotion) {
     clearTimeout(this._neutralTimer);
-    this._queue.push({ b64, text, emotion });
+    const entry = { seq, text, emotion, chunks: [], ended: false, onData: null };
+    this._streams.set(seq, entry);
+    this._queue.push(entry);
     if (!this._playing) this._playNext();
   },
 
+  append(seq, bytes) {
+    const entry = this._streams.get(seq);
+    if (!entry) return;
+    entry.chunks.push(bytes);
+    entry.onData?.();
+  },
+
+  end(seq) {
+    const entry = this._streams.get(seq);
+    if (!entry) return;
+    this._streams.delete(seq);
+    entry.ended = true;
+    entry.onData?.();
+  },
+
+  // Feed chunks into a SourceBuffer as they arrive, closing the stream on end()
+  _mediaSourceUrl(entry) {
+    const ms = new MediaSource();
+    ms.addEventListener('sourceopen', () => {
+      const sb = ms.addSourceBuffer('audio/mpeg');
+      sb.mode = 'sequence';
+      let sent = 0;
+      const pump = () => {
+        if (sb.updating || ms.readyState !== 'open') return;
+        if (sent < entry.chunks.length) sb.appendBuffer(entry.chunks[sent++]);
+        else if (entry.ended) ms.endOfStream();
+      };
+      sb.addEventListener('updateend', pump);
+      entry.onData = pump;
+      pump();
+    }, { once: true });
+    return URL.createObjectURL(ms);
+  },
+
   _playNext() {
     if (this._queue.length === 0) {
       this._playing = false;
@@ -801,10 +833,29 @@ const ttsPlayer = {
       return;
     }
     this._playing = true;
-    const { b64, text, emotion } = this._queue.shift();
+    const entry = this._queue[0];
+    // Open playback only once there is audio: the first chunk with MediaSource,
+    // the full MP3 without it. A stream that ends empty never opens a player.
+    const ready = () => entry.ended || (MSE_MP3 && entry.chunks.length > 0);
+    if (!ready()) {
+      entry.onData = () => { if (ready()) { entry.onData = null; this._playNext(); } };
+      return;
+    }
+    this._queue.shift();
+    const { emotion } = entry;
+    if (entry.chunks.length === 0) {
+      // TTS produced nothing (failed or edge-tts missing) — still show the emotion
+      if (emotion) face.setEmotion(emotion);
+      this._playNext();
+      return;
+    }
 
     let objUrl;
-    try { objUrl = b64ToObjectUrl(b64); }
+    try {
+      objUrl = entry.ended
+        ? URL.createObjectURL(new Blob(entry.chunks, { type: 'audio/mpeg' }))
+        : this._mediaSourceUrl(entry);
+    }
     catch (e) { console.warn('[TTS] Decode error:', e); this._playing = false; this._playNext(); return; }
 
     const audio = new Audio(objUrl);
@@ -848,6 +899,7 @@ const ttsPlayer = {
 
   clear() {
     this._queue = [];
+    this._streams.clear();  // drop chunks still arriving for the old reply
     if (this._currentAudio) { this._currentAudio.pause(); this._currentAudio = null; }
     face.stopSpeaking();
     clearTimeout(this._neutralTimer);
@@ -860,12 +912,20 @@ const ttsPlayer = {
 // ─────────────────────────────────────────────────
 const ws = {
   socket: null,
+  _headers: new Map(),  // seq → dialogue header whose audio has not begun yet
 
   connect() {
     this.socket = new WebSocket(`ws://${location.hostname}:8000/ws`);
+    this.socket.binaryType = 'arraybuffer';  // binary frames carry seq-tagged MP3 chunks
+    this._headers.clear();
     this._status('connecting');
     this.socket.onopen = () => { console.log('[WS] Connected'); this._status('connected'); };
-    this.socket.onmessage = ev => { try { this._handle(JSON.parse(ev.data)); } catch (_) { } };
+    this.socket.onmessage = ev => {
+      try {
+        if (typeof ev.data === 'string') this._handle(JSON.parse(ev.data));
+        else this._handleAudio(ev.data);
+      } catch (_) { }
+    };
     this.socket.onerror = () => this._status('error');
     this.socket.onclose = () => { this._status('disconnected'); setTimeout(() => this.connect(), 2000); };
   },
@@ -883,6 +943,18 @@ const ws = {
 
   _handle(cmd) {
     console.log('[WS]', cmd.type, cmd.emotion || '', (cmd.text || '').slice(0, 50));
+    if (cmd.type === 'dialogue_batch') {
+      // Several sentences coalesced into one frame — replay them in order
+      for (const item of cmd.items || []) this._handle(item);
+      return;
+    }
+    if (cmd.type === 'audio_begin') {
+      const header = this._headers.get(cmd.seq);
+      this._headers.delete(cmd.seq);
+      ttsPlayer.begin(cmd.seq, header?.text, header?.emotion);
+      return;
+    }
+    if (cmd.type === 'audio_end') { ttsPlayer.end(cmd.seq); return; }
     if (cmd.type !== 'dialogue') return;
 
     // Subtitle
@@ -901,8 +973,8 @@ const ws = {
       );
     }
 
-    if (cmd.audioB64) {
-      ttsPlayer.enqueue(cmd.audioB64, cmd.text, cmd.emotion);
+    if (cmd.audio) {
+      this._headers.set(cmd.seq, cmd);
     } else if (cmd.emotion) {
       face.setEmotion(cmd.emotion);
     }
@@ -924,6 +996,13 @@ const ws = {
     }
   },
 
+  // Binary frame = 4-byte big-endian seq + MP3 chunk
+  _handleAudio(buffer) {
+    if (buffer.byteLength <= 4) return;
+    const seq = new DataView(buffer).getUint32(0);
+    ttsPlayer.append(seq, new Uint8Array(buffer, 4));
+  },
+
   _status(state) {
     const ind = document.getElementById('ws-indicator');
     const lbl = document.getElementById('ws-label');
@@ -3,24 +3,44 @@
 AI Girlfriend VRM — Python Backend
 FastAPI + WebSocket server with:
   - Real Ollama AI (Sakura persona), streamed sentence-by-sentence
-  - edge-tts audio generated on server, sent as base64 inline in WebSocket
+  - edge-tts audio generated on server, streamed chunk-by-chunk as binary WebSocket frames
   - No separate HTTP fetch needed — zero extra RTT for audio
   - True async pipeline: Ollama generates next sentence while TTS encodes current one
 """
 
 import asyncio
-import base64
 import json
+import os
 import re
 import unicodedata
 import uuid
+from bisect import bisect_right
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
 from pathlib import Path
 
+import orjson
 import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
+try:
+    import uvloop  # libuv-backed event loop (not available on Windows); selected in uvicorn.run
+except ImportError:
+    uvloop = None
+
+# Imported once here rather than inside the hot paths; the server still starts
+# without them (no AI replies / no voice) so the UI can be worked on offline.
+try:
+    import httpx  # installed with ollama; its transport errors mean Ollama is unreachable
+    import ollama
+except ImportError:
+    httpx = ollama = None
+try:
+    import edge_tts
+except ImportError:
+    edge_tts = None
+
 # ─────────────────────────────────────────────────
 # APP SETUP
 # ─────────────────────────────────────────────────
@@ -36,16 +56,18 @@ if THREE_VRM_DIR.exists():
 app.mount("/static", StaticFiles(directory=BASE_DIR), name="static")
 
 
-@app.get("/")
-async def root():
-    return FileResponse(BASE_DIR / "index.html")
-
-
 # ─────────────────────────────────────────────────
 # SAKURA PERSONA & OLLAMA
 # ─────────────────────────────────────────────────
 
 _SENTENCE_END = re.compile(r'(?<=[.!?\n])\s+')
+_ACTION_RE = re.compile(r'\[?ACTION:\s*([^\])\n]+)\]?', re.IGNORECASE)
+_EMOTION_TAG_RE = re.compile(r'^\[(\w+)\]\s*')
+# *actions*, (asides), stray asterisks and astral-plane emojis — stripped in one pass
+_NOISE = re.compile(r'\*[^*]+\*|\([^)]+\)|\*|[\U00010000-\U0010ffff]')
+VALID_EMOTIONS = {"happy", "excited", "love", "sad", "angry",
+                  "worried", "surprised", "thinking", "neutral"}
+
 MODEL = "llama2:7b"
 
 SYSTEM_PROMPT = """Your name is Sakura. You are a loving, emotional wife having a warm real-time conversation with your husband.
@@ -221,53 +243,136 @@ AVAILABLE_ACTIONS = {
 
 import random
 
+# ── Precomputed lookups for guess_action_from_text (built once at import) ──
+_ACTION_STOP_WORDS = {'dance', 'dancing', 'pose', 'move', 'part', 'standing', 'female', 'boy', 'some', 'the', 'a', 'do', 'show', 'me', 'your', 'my', 'please', 'can', 'you'}
+_NON_ALNUM = re.compile(r'[^a-z0-9\s]')
+
+_ACTION_PATHS: list[str] = list(AVAILABLE_ACTIONS.values())
+
+
+def _build_action_index() -> tuple[list[tuple[str, str]], dict[str, set[int]]]:
+    """Return (base_name, path) pairs in AVAILABLE_ACTIONS order, and an
+    inverted index of keyword → indices into _ACTION_PATHS."""
+    base_names = []
+    index = defaultdict(set)
+    for i, key in enumerate(AVAILABLE_ACTIONS):
+        base_name = key.split('/')[-1].replace('.fbx', '').replace('.vrma', '').lower().strip()
+        if base_name:
+            base_names.append((base_name, _ACTION_PATHS[i]))
+        for word in set(_NON_ALNUM.sub('', base_name).split()) - _ACTION_STOP_WORDS:
+            index[word].add(i)
+    return base_names, index
+
+
+_ACTION_BASENAMES, _ACTION_INDEX = _build_action_index()
+
+_DANCES = [v for k, v in AVAILABLE_ACTIONS.items() if k.startswith('dance/')]
+_POSES = [v for k, v in AVAILABLE_ACTIONS.items() if k.startswith('pose/')]
+
+
 def guess_action_from_text(text: str) -> str | None:
     """Fallback: if the 7B LLM forgets the format, guess requested action from user input."""
     t = text.lower()
-    t_clean = re.sub(r'[^a-z0-9\s]', '', t)
-    user_words = set(t_clean.split())
+    user_words = set(_NON_ALNUM.sub('', t).split())
 
     # Try exact base name match first (e.g., "swing dancing")
-    for key, val in AVAILABLE_ACTIONS.items():
-        base_name = key.split('/')[-1].replace('.fbx','').replace('.vrma','').lower().strip()
-        if base_name and base_name in t:
+    for base_name, val in _ACTION_BASENAMES:
+        if base_name in t:
             return val
 
-    # Try score-based fuzzy matching (highest overlap of non-stop words wins)
-    stop_words = {'dance', 'dancing', 'pose', 'move', 'part', 'standing', 'female', 'boy', 'some', 'the', 'a', 'do', 'show', 'me', 'your', 'my', 'please', 'can', 'you'}
-    best_match = None
-    best_score = 0
-    
-    for key, val in AVAILABLE_ACTIONS.items():
-        base_name = key.split('/')[-1].replace('.fbx','').replace('.vrma','').lower().strip()
-        action_words = set(re.sub(r'[^a-z0-9\s]', '', base_name).split()) - stop_words
-        
-        overlap = len(user_words & action_words)
-        if overlap > best_score:
-            best_score = overlap
-            best_match = val
-            
-    if best_match:
-        return best_match
-    
+    # Score-based fuzzy matching via the inverted index (highest keyword overlap wins,
+    # earliest action breaks ties)
+    scores = Counter()
+    for w in user_words:
+        scores.update(_ACTION_INDEX.get(w, ()))
+    if scores:
+        best = max(scores, key=lambda i: (scores[i], -i))
+        return _ACTION_PATHS[best]
+
     # Generic fallbacks (Randomize the selection so it doesn't repeat the same dance forever)
     if "dance" in t and "pose" not in t:
-        dances = [v for k, v in AVAILABLE_ACTIONS.items() if k.lower().startswith('dance/')]
-        return random.choice(dances) if dances else None
+        return random.choice(_DANCES) if _DANCES else None
 
     if "pose" in t and "dance" not in t:
-        poses = [v for k, v in AVAILABLE_ACTIONS.items() if k.lower().startswith('pose/')]
-        return random.choice(poses) if poses else None
-        
+        return random.choice(_POSES) if _POSES else None
+
     return None
 
-_history: list[dict] = [{"role": "system", "content": SYSTEM_PROMPT}]
+# Conversation history lives on each WebSocket (websocket.state.history), so
+# nothing here is per-process state and multiple uvicorn workers are safe.
+MAX_HISTORY_MESSAGES = 24  # ~12 turns kept after the system prompt
+SENTENCE_QUEUE_SIZE = 8    # sentences (each with TTS in flight) buffered ahead of the sender
+_ollama_client = None
 
 
-def _ollama_stream_sync(user_text: str, result_queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, implied_action: str = None):
-    """Run Ollama streaming in a thread, pushing sentences into an async queue."""
-    import ollama
-    _history.append({"role": "user", "content": user_text})
+def _new_history() -> list[dict]:
+    return [{"role": "system", "content": SYSTEM_PROMPT}]
+
+
+def _get_ollama_client():
+    """Lazily create one shared AsyncClient for the whole process."""
+    global _ollama_client
+    if ollama is None:
+        raise RuntimeError("the 'ollama' package is not installed")
+    if _ollama_client is None:
+        _ollama_client = ollama.AsyncClient()
+    return _ollama_client
+
+
+# ── Ollama availability (probed off the message path) ─────────────────
+# app.state.ollama_ok is set at startup; a failed stream flips it off and a
+# background task re-probes with exponential backoff until Ollama is back.
+OLLAMA_RECHECK_MAX_DELAY = 60.0
+app.state.ollama_ok = False
+app.state.ollama_recheck = None
+
+
+async def _probe_ollama() -> bool:
+    try:
+        await _get_ollama_client().list()
+        return True
+    except Exception:
+        return False
+
+
+async def _recheck_ollama():
+    delay = 1.0
+    while not await _probe_ollama():
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, OLLAMA_RECHECK_MAX_DELAY)
+    app.state.ollama_ok = True
+    app.state.ollama_recheck = None
+    print("[Ollama] Reachable again")
+
+
+def _is_ollama_unreachable(e: Exception) -> bool:
+    """True for connection/transport failures or a 5xx from Ollama, not for our own bugs."""
+    if isinstance(e, ConnectionError):
+        return True
+    if ollama is None:
+        return False
+    if isinstance(e, ollama.ResponseError):
+        return e.status_code >= 500
+    return isinstance(e, httpx.TransportError)
+
+
+def _mark_ollama_down():
+    app.state.ollama_ok = False
+    if ollama is None:
+        return  # nothing to wait for — the package is missing, not the server
+    if app.state.ollama_recheck is None:
+        app.state.ollama_recheck = asyncio.create_task(_recheck_ollama())
+
+
+async def _put_sentence(result_queue: asyncio.Queue, item: dict):
+    """Queue a parsed sentence with its TTS already streaming in the background."""
+    item["audio"] = start_tts(item["text"]) if item["text"] else None
+    await result_queue.put(item)
+
+
+async def _ollama_stream(user_text: str, history: list[dict], result_queue: asyncio.Queue, implied_action: str = None):
+    """Stream Ollama on the event loop, pushing sentences into an async queue."""
+    history.append({"role": "user", "content": user_text})
     full_reply = ""
     buffer = ""
     found_action = False
@@ -275,12 +380,12 @@ def _ollama_stream_sync(user_text: str, result_queue: asyncio.Queue, loop: async
     pose_injected = False
 
     try:
-        stream = ollama.chat(
+        stream = await _get_ollama_client().chat(
             model=MODEL,
-            messages=_history,
+            messages=history,
             stream=True,
         )
-        for chunk in stream:
+        async for chunk in stream:
             token = chunk["message"]["content"]
             buffer += token
             full_reply += token
@@ -290,7 +395,7 @@ def _ollama_stream_sync(user_text: str, result_queue: asyncio.Queue, loop: async
                     s = sentence.strip()
                     if s:
                         # ── Extract [ACTION: ...] tag ──────────────────────────
-                        action_match = re.search(r'\[?ACTION:\s*([^])$\n]+)\]?', s, re.IGNORECASE)
+                        action_match = _ACTION_RE.search(s)
                         action_file = None
                         if action_match:
                             raw_action = action_match.group(1).strip().lower()
@@ -300,35 +405,24 @@ def _ollama_stream_sync(user_text: str, result_queue: asyncio.Queue, loop: async
 
                         # ── Extract [emotion] tag the LLM wrote at sentence start ──
                         # Format: [happy] text...  or  [love] text...
-                        VALID_EMOTIONS = {"happy", "excited", "love", "sad", "angry",
-                                          "worried", "surprised", "thinking", "neutral"}
                         emotion_tag = None
-                        emo_match = re.match(r'^\[(\w+)\]\s*', s)
+                        emo_match = _EMOTION_TAG_RE.match(s)
                         if emo_match and emo_match.group(1).lower() in VALID_EMOTIONS:
                             emotion_tag = emo_match.group(1).lower()
                             s = s[emo_match.end():]  # strip tag from spoken text
-                        # Fallback: detect from content if LLM forgot the tag
-                        if not emotion_tag:
-                            emotion_tag = detect_emotion(s)
+                        # Untagged sentences are classified by the consumer, one pass per batch
 
                         # ── Strip leftover markdown / emojis ───────────────────
-                        s = re.sub(r'\*[^*]+\*', '', s).strip()
-                        s = re.sub(r'\([^)]+\)', '', s).strip()
-                        s = s.replace('*', '')
-                        s = re.sub(r'[\U00010000-\U0010ffff]', '', s)
-                        s = s.strip()
+                        s = _NOISE.sub('', s).strip()
 
                         if s or action_file:
                             sentence_count += 1
-                            asyncio.run_coroutine_threadsafe(
-                                result_queue.put({"text": s, "action": action_file, "emotion": emotion_tag}),
-                                loop
-                            )
+                            await _put_sentence(result_queue, {"text": s, "action": action_file, "emotion": emotion_tag})
                 buffer = parts[-1]
         
         # Check remaining buffer
         buffer_str = buffer.strip()
-        action_match = re.search(r'\[?ACTION:\s*([^])$\n]+)\]?', buffer_str, re.IGNORECASE)
+        action_match = _ACTION_RE.search(buffer_str)
         action_file = None
         if action_match:
             raw_action = action_match.group(1).strip().lower()
@@ -337,25 +431,27 @@ def _ollama_stream_sync(user_text: str, result_queue: asyncio.Queue, loop: async
             found_action = True
 
         # Final cleanup for the tail 
-        buffer_str = re.sub(r'\*[^*]+\*', '', buffer_str).strip()
-        buffer_str = re.sub(r'\([^)]+\)', '', buffer_str).strip()
-        buffer_str = buffer_str.replace('*', '')
-        buffer_str = re.sub(r'[\U00010000-\U0010ffff]', '', buffer_str).strip()
+        buffer_str = _NOISE.sub('', buffer_str).strip()
 
         # If LLM failed to output an action but user explicitly requested one, manually append it
         if implied_action and not found_action and not action_file:
             action_file = implied_action
 
         if buffer_str or action_file:
-            asyncio.run_coroutine_threadsafe(result_queue.put({"text": buffer_str, "action": action_file}), loop)
+            await _put_sentence(result_queue, {"text": buffer_str, "action": action_file})
             
     except Exception as e:
-        asyncio.run_coroutine_threadsafe(
-            result_queue.put({"text": f"Oh no, something went wrong! {e}", "action": None}), loop
-        )
+        if _is_ollama_unreachable(e):
+            _mark_ollama_down()
+        await _put_sentence(result_queue, {"text": f"Oh no, something went wrong! {e}", "action": None})
     finally:
-        _history.append({"role": "assistant", "content": full_reply})
-        asyncio.run_coroutine_threadsafe(result_queue.put(None), loop)  # sentinel
+        history.append({"role": "assistant", "content": full_reply})
+        # Keep the system prompt plus only recent turns so prompts stay short
+        if len(history) > MAX_HISTORY_MESSAGES + 1:
+            history[:] = [history[0]] + history[-MAX_HISTORY_MESSAGES:]
+    # Not in `finally`: if the consumer is gone and we were cancelled, a put on a
+    # full queue would block forever.
+    await result_queue.put(None)  # sentinel
 
 
 # ─────────────────────────────────────────────────
@@ -469,58 +565,156 @@ TALKING_POSES: dict[str, list[str]] = {
 }
 
 
+def _build_emotion_automaton():
+    """Compile every EMOTION_RULES keyword into one Aho–Corasick automaton.
+
+    Each keyword maps to (rule_index, emotion) so the lowest index among all
+    hits reproduces the original first-rule-wins priority.
+    """
+    try:
+        import ahocorasick
+    except ImportError:
+        return None
+    automaton = ahocorasick.Automaton()
+    for priority, (keywords, emotion) in enumerate(EMOTION_RULES):
+        for kw in keywords:
+            if not automaton.exists(kw):  # keep the highest-priority rule
+                automaton.add_word(kw, (priority, emotion))
+    automaton.make_automaton()
+    return automaton
+
+
+_EMOTION_AUTOMATON = _build_emotion_automaton()
+
+# Fallback when pyahocorasick is unavailable: one C-level regex search per rule
+EMOTION_PATTERNS: list[tuple[re.Pattern, str]] = [
+    (re.compile('|'.join(map(re.escape, keywords))), emotion)
+    for keywords, emotion in EMOTION_RULES
+]
+
+
 def detect_emotion(text: str) -> str:
-    t = text.lower()
-    for keywords, emotion in EMOTION_RULES:
-        if any(kw in t for kw in keywords):
+    return _detect_emotion_cached(text.lower())
+
+
+def detect_emotions(texts: list[str]) -> list[str]:
+    """Classify several sentences with a single automaton pass over their joined text.
+
+    Hits are bucketed back to sentences by offset; no keyword contains a
+    newline, so none can straddle a boundary.
+    """
+    if _EMOTION_AUTOMATON is None or len(texts) < 2:
+        return [detect_emotion(t) for t in texts]
+    lowered = [t.lower() for t in texts]
+    starts = []
+    offset = 0
+    for t in lowered:
+        starts.append(offset)
+        offset += len(t) + 1  # "\n" separator
+    best: list[tuple[int, str] | None] = [None] * len(texts)
+    for end, hit in _EMOTION_AUTOMATON.iter("\n".join(lowered)):
+        i = bisect_right(starts, end) - 1
+        if best[i] is None or hit[0] < best[i][0]:
+            best[i] = hit
+    return [hit[1] if hit else "neutral" for hit in best]
+
+
+@lru_cache(maxsize=4096)
+def _detect_emotion_cached(t: str) -> str:
+    """Classify already-lowercased text; memoized since EMOTION_RULES never changes at runtime."""
+    if _EMOTION_AUTOMATON is not None:
+        # Single O(len(text)) pass over all keywords at once
+        best = min((hit for _, hit in _EMOTION_AUTOMATON.iter(t)),
+                   default=None, key=lambda hit: hit[0])
+        return best[1] if best else "neutral"
+    for pattern, emotion in EMOTION_PATTERNS:
+        if pattern.search(t):
             return emotion
     return "neutral"
 
 
 # ─────────────────────────────────────────────────
-# TTS — edge-tts → base64 bytes
+# TTS — edge-tts → MP3 bytes
 # ─────────────────────────────────────────────────
 
 VOICE = "en-US-AnaNeural"
 
+# LRU of cleaned sentence → MP3 bytes, so recurring lines skip the Edge round-trip
+TTS_CACHE_SIZE = 512
+_TTS_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+
+# Cap simultaneous requests to the Edge TTS endpoint
+TTS_CONCURRENCY = 4
+_tts_semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+
+
+def _build_tts_table() -> dict[int, None]:
+    """Code points clean_for_tts drops, for a single str.translate pass.
+
+    Astral-plane emojis (0x1F000+) never reach the table: _NOISE strips the
+    whole astral range before translate runs.
+    """
+    table = {cp: None for cp in range(0x10000)
+             if unicodedata.category(chr(cp)) in ('So', 'Sm')}
+    table.update({cp: None for cp in range(0x2600, 0x27C0)})
+    table.update({cp: None for cp in range(0xFE00, 0xFE10)})
+    table.update({cp: None for cp in (0x200D, *map(ord, '~*_#'))})
+    return table
+
+
+_TTS_TABLE = _build_tts_table()
+_WHITESPACE = re.compile(r'\s+')
+# Any ASCII character the full clean would touch; if none is present, skip it
+_TTS_ASCII_SUSPECT = re.compile(
+    '[' + re.escape(''.join(chr(cp) for cp in _TTS_TABLE if cp < 128) + '()') + ']'
+)
+
 
 def clean_for_tts(text: str) -> str:
     """Strip emojis, markdown, tildes, action text."""
-    text = re.sub(r'\*[^*]+\*', '', text)
-
-    def _keep(ch: str) -> bool:
-        cat = unicodedata.category(ch)
-        cp = ord(ch)
-        return not (
-            cat in ('So', 'Sm')
-            or 0x1F000 <= cp <= 0x1FFFF
-            or 0x2600  <= cp <= 0x27BF
-            or 0xFE00  <= cp <= 0xFE0F
-            or cp in (0x200D, 0xFE0F)
-        )
-    text = ''.join(ch for ch in text if _keep(ch))
-    text = text.replace('~', '')
-    text = re.sub(r'[*_#]+', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    if text.isascii() and not _TTS_ASCII_SUSPECT.search(text):
+        return _WHITESPACE.sub(' ', text).strip()  # common case: already clean
+    text = _NOISE.sub('', text).translate(_TTS_TABLE)
+    return _WHITESPACE.sub(' ', text).strip()
 
 
-async def generate_tts_b64(text: str) -> str:
-    """Generate TTS audio and return as base64 string."""
-    import edge_tts
-    cleaned = clean_for_tts(text)
-    if not cleaned.strip():
-        return ""
+async def stream_tts(text: str, out: asyncio.Queue):
+    """Push MP3 chunks into `out` as edge-tts produces them, then None."""
     try:
-        tts = edge_tts.Communicate(cleaned, voice=VOICE, rate="+10%", pitch="+5Hz")
-        audio_bytes = b""
-        async for chunk in tts.stream():
-            if chunk["type"] == "audio":
-                audio_bytes += chunk["data"]
-        return base64.b64encode(audio_bytes).decode("utf-8")
+        cleaned = clean_for_tts(text)
+        if edge_tts is None or not cleaned.strip():
+            return
+        if cleaned in _TTS_CACHE:
+            _TTS_CACHE.move_to_end(cleaned)
+            await out.put(_TTS_CACHE[cleaned])
+            return
+        async with _tts_semaphore:
+            tts = edge_tts.Communicate(cleaned, voice=VOICE, rate="+10%", pitch="+5Hz")
+            audio_bytes = b""
+            async for chunk in tts.stream():
+                if chunk["type"] == "audio":
+                    audio_bytes += chunk["data"]
+                    await out.put(chunk["data"])
+        if audio_bytes:
+            _TTS_CACHE[cleaned] = audio_bytes
+            if len(_TTS_CACHE) > TTS_CACHE_SIZE:
+                _TTS_CACHE.popitem(last=False)
     except Exception as e:
         print(f"[TTS Error] Failed to generate audio for '{text[:20]}...': {e}")
-        return ""
+    finally:
+        await out.put(None)  # sentinel
+
+
+_tts_tasks: set[asyncio.Task] = set()
+
+
+def start_tts(text: str) -> asyncio.Queue:
+    """Start streaming TTS for text in the background; returns its chunk queue."""
+    chunks: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(stream_tts(text, chunks))
+    _tts_tasks.add(task)  # hold a reference until the task finishes
+    task.add_done_callback(_tts_tasks.discard)
+    return chunks
 
 
 # ─────────────────────────────────────────────────
@@ -533,6 +727,7 @@ class ConnectionManager:
 
     async def connect(self, ws: WebSocket):
         await ws.accept()
+        ws.state.history = _new_history()
         self.active.append(ws)
         print(f"[WS] Client connected. Total: {len(self.active)}")
 
@@ -542,7 +737,20 @@ class ConnectionManager:
         print(f"[WS] Client disconnected. Total: {len(self.active)}")
 
     async def send_json(self, ws: WebSocket, data: dict):
-        await ws.send_text(json.dumps(data))
+        # JSON goes out as text frames so binary frames are unambiguously audio
+        await ws.send_text(orjson.dumps(data).decode())
+
+    async def send_audio(self, ws: WebSocket, seq: int, chunks: asyncio.Queue):
+        """Forward one utterance's MP3 chunks as they arrive.
+
+        Framing: audio_begin JSON, then binary frames of 4-byte big-endian seq +
+        MP3 data, then audio_end JSON.
+        """
+        await self.send_json(ws, {"type": "audio_begin", "seq": seq, "mime": "audio/mpeg"})
+        prefix = seq.to_bytes(4, "big")
+        while (chunk := await chunks.get()) is not None:
+            await ws.send_bytes(prefix + chunk)
+        await self.send_json(ws, {"type": "audio_end", "seq": seq})
 
 
 manager = ConnectionManager()
@@ -551,6 +759,7 @@ manager = ConnectionManager()
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
+    seq = 0  # per-connection dialogue counter, tags each utterance's audio frames
     try:
         while True:
             raw = await websocket.receive_text()
@@ -566,84 +775,108 @@ async def websocket_endpoint(websocket: WebSocket):
                 if not user_text:
                     continue
 
-                # Check Ollama availability
-                try:
-                    import ollama as _ol
-                    _ol.list()
-                    use_ollama = True
-                except Exception:
-                    use_ollama = False
-
-                if not use_ollama:
+                # Ollama availability is cached by the startup probe / background recheck
+                if not app.state.ollama_ok:
                     fallback = "Oh no, I cannot reach Ollama right now! Please make sure Ollama is running."
-                    audio_b64 = await generate_tts_b64(fallback)
+                    audio = start_tts(fallback)
+                    seq += 1
                     await manager.send_json(websocket, {
                         "type": "dialogue",
                         "text": fallback,
                         "emotion": "worried",
                         "gesture": "think",
                         "lipSync": True,
-                        "audioB64": audio_b64,
+                        "seq": seq,
+                        "audio": True,
                         "first": True,
                         "streaming": False,
                     })
+                    await manager.send_audio(websocket, seq, audio)
                     continue
                 
                 # Pre-calculate fallback action if LLM forgets
                 implied_action = guess_action_from_text(user_text)
 
                 # ── TRUE ASYNC PIPELINE ──────────────────────────────
-                # Ollama streams in a background thread → sentences into queue.
-                # Main coroutine pulls each sentence, generates TTS, sends WS.
-                # While TTS runs for sentence N, Ollama generates sentence N+1.
+                # Ollama streams in a background task → sentences into queue.
+                # Each sentence's TTS starts as soon as it is queued, so up to
+                # TTS_CONCURRENCY syntheses overlap while Ollama keeps generating.
+                # Main coroutine sends headers, then forwards each sentence's
+                # audio chunks in order as edge-tts produces them.
                 # ────────────────────────────────────────────────────
 
-                loop = asyncio.get_event_loop()
-                sentence_queue: asyncio.Queue = asyncio.Queue()
-
-                # Start Ollama in background thread
-                loop.run_in_executor(
-                    None,
-                    _ollama_stream_sync,
-                    user_text,
-                    sentence_queue,
-                    loop,
-                    implied_action
-                )
-
-                first = True
-                while True:
-                    item = await sentence_queue.get()
-                    if item is None:
-                        break  # Ollama done
-
-                    sentence = item["text"]
-                    action_file = item["action"]
+                # Bounded: when TTS/sending falls behind, put() blocks Ollama
+                # instead of buffering an unbounded backlog of sentences.
+                sentence_queue: asyncio.Queue = asyncio.Queue(maxsize=SENTENCE_QUEUE_SIZE)
 
-                    emotion = detect_emotion(sentence) if sentence else "neutral"
-                    gesture = GESTURE_FOR_EMOTION.get(emotion, "idle")
-
-                    # Generate TTS for this sentence (Ollama fills queue concurrently)
-                    audio_b64 = await generate_tts_b64(sentence) if sentence else ""
+                # Start Ollama as a task on this loop (no thread hop per token).
+                # Keep the handle: it pins the task and lets us cancel it if we bail out.
+                producer = asyncio.create_task(
+                    _ollama_stream(user_text, websocket.state.history, sentence_queue, implied_action)
+                )
 
-                    command = {
-                        "type": "dialogue",
-                        "text": sentence,
-                        "emotion": emotion,
-                        "gesture": gesture,
-                        "lipSync": True,
-                        "audioB64": audio_b64,   # 🔊 inline — no browser fetch needed
-                        "streaming": True,
-                        "first": first,
-                        "action": action_file,   # 💃 pass action down to frontend
-                    }
-                    first = False
-                    print(f"[WS] [{emotion}] {sentence[:60]} (Action: {action_file})")
-                    await manager.send_json(websocket, command)
+                try:
+                    first = True
+                    done = False
+                    while not done:
+                        item = await sentence_queue.get()
+                        if item is None:
+                            break  # Ollama done
+
+                        # Coalesce every sentence that is already waiting into one frame
+                        items = [item]
+                        while True:
+                            try:
+                                extra = sentence_queue.get_nowait()
+                            except asyncio.QueueEmpty:
+                                break
+                            if extra is None:
+                                done = True
+                                break
+                            items.append(extra)
+
+                        # Prefer the LLM's own [emotion] tag; classify the rest in one pass
+                        untagged = [it for it in items if not it.get("emotion")]
+                        for it, emotion in zip(untagged, detect_emotions([it["text"] for it in untagged])):
+                            it["emotion"] = emotion
+
+                        commands = []
+                        for it in items:
+                            sentence = it["text"]
+                            emotion = it["emotion"]
+                            action_file = it["action"]
+
+                            gesture = GESTURE_FOR_EMOTION.get(emotion, "idle")
+
+                            seq += 1
+                            commands.append({
+                                "type": "dialogue",
+                                "text": sentence,
+                                "emotion": emotion,
+                                "gesture": gesture,
+                                "lipSync": True,
+                                "seq": seq,
+                                "audio": it["audio"] is not None,  # 🔊 MP3 chunks stream after the header
+                                "streaming": True,
+                                "first": first,
+                                "action": action_file,   # 💃 pass action down to frontend
+                            })
+                            first = False
+                            print(f"[WS] [{emotion}] {sentence[:60]} (Action: {action_file})")
+
+                        if len(commands) == 1:
+                            await manager.send_json(websocket, commands[0])
+                        else:
+                            await manager.send_json(websocket, {"type": "dialogue_batch", "items": commands})
+                        # Stream each sentence's audio in order (TTS for all of them is already running)
+                        for cmd, it in zip(commands, items):
+                            if it["audio"] is not None:
+                                await manager.send_audio(websocket, cmd["seq"], it["audio"])
+                finally:
+                    producer.cancel()  # no-op once the stream has finished
 
             elif msg.get("type") == "clear":
-                _history.clear()
-                _history.append({"role": "system", "content": SYSTEM_PROMPT})
+                websocket.state.history = _new_history()
                 await manager.send_json(websocket, {"type": "cleared"})
 
     except WebSocketDisconnect:
@@ -664,19 +897,24 @@ async def on_startup():
     print("  🌸  AI Girlfriend VRM Backend")
     print("  http://localhost:8000")
     print("  WebSocket :  ws://localhost:8000/ws")
-    print("  Audio     :  inline base64 over WebSocket (no fetch)")
+    print("  Audio     :  streamed binary MP3 chunks over WebSocket (no fetch)")
     print("  Voice     :  en-US-AnaNeural (edge-tts)")
     print("  AI Model  :  llama2:7b (Ollama)")
     print("=" * 54)
 
+    if edge_tts is None:
+        print("[TTS] edge-tts is not installed — replies will be silent")
+
+    app.state.ollama_ok = await _probe_ollama()
+    if ollama is None:
+        print("[Ollama] The ollama package is not installed — replies are disabled")
+    elif not app.state.ollama_ok:
+        print("[Ollama] Not reachable — will keep retrying in the background")
+        _mark_ollama_down()
+
 
-# ── Catch-all static files (MUST be last) ────────
-@app.get("/{filename:path}")
-async def serve_file(filename: str):
-    filepath = BASE_DIR / filename
-    if filepath.exists() and filepath.is_file():
-        return FileResponse(filepath)
-    return HTMLResponse("Not found", status_code=404)
+# ── Root static files + index.html at "/" (MUST be last) ────────
+app.mount("/", StaticFiles(directory=BASE_DIR, html=True), name="root")
 
 
 if __name__ == "__main__":
@@ -684,6 +922,10 @@ if __name__ == "__main__":
         "server:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        loop="uvloop" if uvloop else "auto",
+        http="httptools",
+        ws="websockets",
+        reload=False,  # reload mode cannot fork workers
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
         log_level="info",
     )